@@ -6,7 +6,7 @@ This is a MOCK implementation of the Orifice API for development and testing pur
 In a production environment:
 - The actual Orifice hardware device would be used instead of the slider simulator
 - The device's physical sensor would provide real depth/penetration measurements
-- All socket/simulator code would be replaced with calls to the device's native API
+- All shared memory/simulator code would be replaced with calls to the device's native API
 
 This implementation provides:
 1. A fallback simulator UI when no joystick is found (for development without hardware)
@@ -16,16 +16,27 @@ Usage:
     device = orifice.Orifice()
     depth = device.depth  # 0-1024 range
     # Remember to call device.close() when done
+
+Without a joystick, a slider is drawn in the game window itself: pass every
+pygame event to device.handle_event() and call device.draw(screen) when
+redrawing.
+
+With external_sim=True the standalone Tk slider (slider_simulator.py) is
+used instead. It publishes the depth into a shared memory cell that
+device.depth reads directly. To wake up only when the value changes, wait
+on device.fileno() (when not None) and call device.poll() when it is
+readable.
 """
 
 import pygame
 import subprocess
+import mmap
 import os
-import socket
-import threading
-import time
+import tempfile
 import logging
 
+from .shared_depth import SHM_SIZE, DEPTH_STRUCT, SHM_DEPTH, SHM_WAKE_PENDING, SEQ_STRUCT, SHM_SEQ
+
 # Configure logging
 logger = logging.getLogger('orifice.api')
 logging.basicConfig(
@@ -33,6 +44,73 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[logging.StreamHandler()]
 )
+# Hot paths check this instead of formatting debug messages on every sample
+_DEBUG = logger.isEnabledFor(logging.DEBUG)
+
+# The simulator always runs on this machine and the depth is a single state
+# variable, so it is shared through a file-backed memory map rather than a
+# socket (layout in shared_depth.py). Each Orifice creates its own uniquely
+# named file and passes the path to the simulator.
+# The simulator signals changes over an inherited pipe where fds can be passed
+WAKE_PIPE_SUPPORTED = os.name == "posix"
+
+class InProcessSlider:
+    """
+    Mouse-draggable depth slider drawn inside the game window
+
+    Used in place of a joystick when no hardware is present. The top of the
+    track is 1024 (fully inserted), the bottom is 0, like the Tk simulator.
+    """
+
+    TRACK_WIDTH = 30
+    KNOB_HEIGHT = 12
+
+    def __init__(self, rect=None):
+        """
+        Args:
+            rect (pygame.Rect): Track area; defaults to the right edge of the
+                                surface it is first drawn on
+        """
+        self.rect = pygame.Rect(rect) if rect is not None else None
+        self.depth = 0
+        self.dragging = False
+
+    def handle_event(self, event):
+        """Update the depth from mouse presses and drags on the track"""
+        if self.rect is None:
+            return  # Not drawn yet
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if self.rect.inflate(0, self.KNOB_HEIGHT).collidepoint(event.pos):
+                self.dragging = True
+                self._set_from_y(event.pos[1])
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            self._set_from_y(event.pos[1])
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            self.dragging = False
+
+    def _set_from_y(self, y):
+        y = max(self.rect.top, min(self.rect.bottom, y))
+        self.depth = round((self.rect.bottom - y) * 1024 / self.rect.height)
+
+    def draw(self, surface):
+        """
+        Draw the slider onto surface
+
+        Returns:
+            pygame.Rect: Area that was drawn (for pygame.display.update)
+        """
+        if self.rect is None:
+            width, height = surface.get_size()
+            self.rect = pygame.Rect(width - self.TRACK_WIDTH - 10, 90, self.TRACK_WIDTH, height - 110)
+
+        # The knob stays inside the track, so redrawing the track erases it
+        pygame.draw.rect(surface, (208, 208, 208), self.rect)
+        knob_y = self.rect.bottom - round(self.depth * self.rect.height / 1024) - self.KNOB_HEIGHT // 2
+        knob_y = max(self.rect.top, min(self.rect.bottom - self.KNOB_HEIGHT, knob_y))
+        knob = pygame.Rect(self.rect.left, knob_y, self.TRACK_WIDTH, self.KNOB_HEIGHT)
+        pygame.draw.rect(surface, (64, 128, 255), knob)
+        return self.rect
+
 
 class Orifice:
     """
@@ -40,29 +118,34 @@ class Orifice:
     
     This class provides access to depth/penetration values either from:
     - A connected joystick (simulating a hardware device)
-    - The slider simulator (when no joystick is present)
+    - An in-window slider (when no joystick is present)
+    - The external Tk slider simulator (when requested with external_sim)
     
     In production deployment, this would connect to the actual Orifice
     hardware and its depth sensor, not a simulator.
     """
     
-    def __init__(self, host='127.0.0.1', port=12345):
+    def __init__(self, external_sim=False):
         """
         Initialize the Orifice interface
         
         Args:
-            host (str): Host for simulator socket connection (mock mode only)
-            port (int): Port for simulator socket connection (mock mode only)
+            external_sim (bool): Use the standalone Tk simulator process
+                                 instead of the in-window slider (mock mode only)
         """
         logger.info("Initializing Orifice API")
-        pygame.init()
+        # The application normally owns pygame; only start it if nobody has
+        if not pygame.get_init():
+            pygame.init()
         pygame.joystick.init()
 
         self.joystick_available = False
         self.depth_value = 0
-        self.socket_connected = False
+        self.slider = None
+        self.shared_depth = None
+        self._shm_path = None
+        self._wake_fd = None
         self.running = True
-        self._depth_lock = threading.Lock()  # Thread safety
 
         if pygame.joystick.get_count() > 0:
             # Using joystick as input method (closer to real hardware)
@@ -70,112 +153,189 @@ class Orifice:
             self.joystick.init()
             self.joystick_available = True
             logger.info(f"Using joystick: {self.joystick.get_name()}")
+        elif not external_sim:
+            # No joystick: draw a slider in the game window
+            # NOTE: In production, this would connect to the actual device instead
+            logger.info("No joystick found, using in-window slider")
+            self.slider = InProcessSlider()
         else:
             # No joystick: launch slider simulator
-            # NOTE: In production, this would connect to the actual device instead
             logger.info("No joystick found, launching slider simulator")
+            self.shared_depth = self.create_shared_depth()
+            self.launch_simulator()
+
+    def create_shared_depth(self):
+        """
+        Create the memory-mapped depth cell the simulator writes into
+
+        The backing file gets a fresh unique name (mkstemp creates it
+        exclusively), so concurrent instances never share or truncate each
+        other's cell. Its path is kept for launch_simulator() and close().
+
+        Note: This method only exists in the mock implementation.
+
+        Returns:
+            mmap.mmap: SHM_SIZE bytes, zeroed (depth 0)
+        """
+        fd, self._shm_path = tempfile.mkstemp(prefix="orifice_depth_")
+        try:
+            os.ftruncate(fd, SHM_SIZE)
+            return mmap.mmap(fd, SHM_SIZE)
+        finally:
+            os.close(fd)  # The mapping stays valid without the fd
+
+    def launch_simulator(self):
+        """
+        Start the slider simulator process
+
+        On POSIX the simulator also gets the write end of a pipe and writes
+        a byte to it whenever the depth changes; the read end is fileno().
+        The shared memory cell exists before the simulator starts, so there
+        is nothing to wait for.
+
+        Note: This method only exists in the mock implementation.
+        """
+        args = ["python3", "api/slider_simulator.py", "--shm", self._shm_path]
+        if not WAKE_PIPE_SUPPORTED:
+            # No fd inheritance (Windows): the depth is simply read every frame
             try:
-                subprocess.Popen(["python3", "api/slider_simulator.py"])
+                subprocess.Popen(args)
                 logger.debug("Slider simulator process started")
             except Exception as e:
                 logger.error(f"Failed to start slider simulator: {e}")
-                
-            # Give the server a moment to start
-            time.sleep(0.2)
-            
-            # Start socket connection in a separate thread
-            logger.debug(f"Connecting to simulator on {host}:{port}")
-            self.client_thread = threading.Thread(target=self.connect_to_server, args=(host, port))
-            self.client_thread.daemon = True
-            self.client_thread.start()
-            logger.debug("Client connection thread started")
-
-    def connect_to_server(self, host, port):
-        """
-        Connect to the slider simulator socket server
-        
+            return
+
+        wake_r, wake_w = os.pipe()
+        try:
+            subprocess.Popen(args + ["--wake-fd", str(wake_w)], pass_fds=(wake_w,))
+            logger.debug("Slider simulator process started")
+        except Exception as e:
+            logger.error(f"Failed to start slider simulator: {e}")
+            os.close(wake_r)
+            return
+        finally:
+            os.close(wake_w)  # Only the child holds the write end now
+        os.set_blocking(wake_r, False)
+        self._wake_fd = wake_r
+
+    def fileno(self):
+        """
+        File descriptor that becomes readable when the depth changes
+
+        Register this with a selector (or select()) and call poll() when it
+        becomes readable.
+
+        Returns:
+            int or None: Simulator wake pipe descriptor, or None when there
+                         is nothing to wait on (joystick, in-window slider,
+                         Windows, or the simulator has exited)
+        """
+        return self._wake_fd
+
+    def poll(self):
+        """
+        Consume pending change notifications from the simulator
+
+        The depth itself is read from shared memory by get_depth(); this only
+        drains the wake pipe so it stops being readable.
+
         Note: This method only exists in the mock implementation.
-        A real deployment would connect to physical hardware instead.
-        
-        Args:
-            host (str): Host address for simulator
-            port (int): Port for simulator
+
+        Returns:
+            bool: False once the simulator has exited, True otherwise
         """
-        logger.debug(f"Attempting to connect to simulator at {host}:{port}")
-        self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.client_socket.settimeout(0.1)  # Short timeout for responsiveness
-        
-        # Try to connect with retries
-        for attempt in range(5):
-            try:
-                self.client_socket.connect((host, port))
-                self.socket_connected = True
-                logger.info(f"Connected to simulator on attempt {attempt+1}")
-                break
-            except socket.error as e:
-                logger.warning(f"Connection attempt {attempt+1} failed: {e}")
-                time.sleep(0.2)
-                
-        if self.socket_connected:
-            logger.info("Setting socket to non-blocking mode")
-            self.client_socket.setblocking(0)  # Non-blocking for better performance
-            buffer = ""
-            
-            while self.running:
-                try:
-                    data = self.client_socket.recv(1024).decode()
-                    if data:
-                        buffer += data
-                        # Process complete messages
-                        while "\n" in buffer:
-                            line, buffer = buffer.split("\n", 1)
-                            try:
-                                with self._depth_lock:
-                                    new_value = int(line)
-                                    logger.debug(f"Received depth value: {new_value}")
-                                    self.depth_value = new_value
-                            except ValueError:
-                                logger.error(f"Received invalid depth value: '{line}'")
-                        # If no newline but we have data, process it
-                        if buffer:
-                            try:
-                                with self._depth_lock:
-                                    new_value = int(buffer)
-                                    logger.debug(f"Received depth value: {new_value}")
-                                    self.depth_value = new_value
-                                buffer = ""
-                            except ValueError:
-                                pass  # Incomplete number, wait for more data
-                except BlockingIOError:
-                    # No data available right now, no problem
-                    time.sleep(0.001)
-                except Exception as e:
-                    # Other errors, including disconnection
-                    logger.error(f"Socket error: {e}")
-                    time.sleep(0.01)
-        else:
-            logger.error("Failed to connect to simulator after 5 attempts")
+        if self._wake_fd is None:
+            return False
+        try:
+            while os.read(self._wake_fd, 4096):
+                pass
+        except BlockingIOError:
+            # Drained, simulator still running. Clear the flag only now:
+            # clearing before the drain could swallow a byte written in
+            # between and leave the flag set with an empty pipe, which would
+            # stop all later wakeups. A change published between the drain
+            # and this store skips its wake byte, but its value is already in
+            # shared memory for the next get_depth()
+            self.shared_depth[SHM_WAKE_PENDING] = 0
+            return True
+        # EOF: every write end is closed, the simulator has exited
+        logger.warning("Slider simulator exited")
+        self._close_wake_fd()
+        return False
+
+    def _close_wake_fd(self):
+        fd, self._wake_fd = self._wake_fd, None
+        try:
+            os.close(fd)
+        except OSError as e:
+            logger.error(f"Error closing wake pipe: {e}")
 
     def get_depth(self):
         """
         Get the current depth/penetration value
         
         In the real implementation, this would read from the physical device.
+
+        The joystick axis is only refreshed when pygame processes events, so
+        call this after the frame's pygame.event.get() (or event.pump()).
         
         Returns:
             int: Depth value between 0-1024
         """
         if self.joystick_available:
-            pygame.event.pump()
             y_axis = self.joystick.get_axis(1)  # always -1.0 to 1.0
             y_axis = max(-1.0, min(1.0, y_axis))  # Clamp it clean
             penetration = int((y_axis + 1.0) * 512)  # Map to 0–1024
-            logger.debug(f"Joystick depth value: {penetration}")
+            if _DEBUG:
+                logger.debug("Joystick depth value: %d", penetration)
             return penetration
+        elif self.slider is not None:
+            return self.slider.depth
+        elif self.shared_depth is not None:
+            self.depth_value = self._read_shared_depth()
+            if _DEBUG:
+                logger.debug("Simulator depth value: %d", self.depth_value)
+            return self.depth_value
         else:
-            with self._depth_lock:
-                logger.debug(f"Simulator depth value: {self.depth_value}")
-                return self.depth_value
+            return self.depth_value
+
+    def _read_shared_depth(self):
+        # Single writer, single reader, no lock: retry while the simulator
+        # is mid-write (odd sequence) or wrote during our read (changed)
+        shm = self.shared_depth
+        for _ in range(100):
+            seq = SEQ_STRUCT.unpack_from(shm, SHM_SEQ)[0]
+            value = DEPTH_STRUCT.unpack_from(shm, SHM_DEPTH)[0]
+            if not seq & 1 and SEQ_STRUCT.unpack_from(shm, SHM_SEQ)[0] == seq:
+                return value
+        # Writer died mid-update; keep the last good value
+        return self.depth_value
+
+    def handle_event(self, event):
+        """
+        Feed a pygame event to the device
+
+        Only the in-window slider uses events; otherwise this does nothing.
+
+        Args:
+            event (pygame.event.Event): Event from pygame.event.get()
+        """
+        if self.slider is not None:
+            self.slider.handle_event(event)
+
+    def draw(self, surface):
+        """
+        Draw device controls (the in-window slider) onto surface
+
+        Args:
+            surface (pygame.Surface): Surface to draw on, usually the display
+
+        Returns:
+            pygame.Rect or None: Area that was drawn, None if nothing was
+        """
+        if self.slider is not None:
+            return self.slider.draw(surface)
+        return None
 
     @property
     def depth(self):
@@ -197,11 +357,16 @@ class Orifice:
         """
         logger.info("Closing Orifice API connection")
         self.running = False
-        if hasattr(self, 'client_socket') and self.socket_connected:
+        if self._wake_fd is not None:
+            self._close_wake_fd()
+        if self.shared_depth is not None:
+            self.shared_depth.close()
+            self.shared_depth = None
+        if self._shm_path is not None:
             try:
-                self.client_socket.close()
-                logger.debug("Socket connection closed")
-            except Exception as e:
-                logger.error(f"Error closing socket: {e}")
-        pygame.quit()
-        logger.debug("Pygame resources released")
+                os.unlink(self._shm_path)
+            except OSError:
+                pass  # Still mapped by the simulator on Windows
+            self._shm_path = None
+        pygame.joystick.quit()  # Leave the display to the application
+        logger.debug("Joystick resources released")
@@ -0,0 +1,21 @@
+"""
+Shared memory layout for the depth cell written by the slider simulator
+
+Imported by both orifice.py (the reader) and slider_simulator.py (the
+writer, which runs as a script with api/ on sys.path), so the layout is
+defined exactly once. Deliberately has no pygame or tkinter import.
+
+Layout (little-endian):
+    offset 0: depth, uint16 (0-1024)
+    offset 2: wake-pending byte, set while a wakeup is unread in the pipe
+    offset 4: sequence counter, uint32, odd while the depth is being written
+"""
+
+import struct
+
+SHM_SIZE = 4096  # One page
+DEPTH_STRUCT = struct.Struct("<H")
+SHM_DEPTH = 0
+SHM_WAKE_PENDING = 2
+SEQ_STRUCT = struct.Struct("<I")
+SHM_SEQ = 4
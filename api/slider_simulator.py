@@ -1,9 +1,12 @@
 import tkinter as tk
-import socket
+import argparse
+import mmap
+import os
 import threading
-import time
 import logging
 
+from shared_depth import SHM_SIZE, DEPTH_STRUCT, SHM_DEPTH, SHM_WAKE_PENDING, SEQ_STRUCT, SHM_SEQ
+
 # Configure logging
 logger = logging.getLogger('orifice.slider')
 logging.basicConfig(
@@ -11,107 +14,127 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[logging.StreamHandler()]
 )
+# Hot paths check this instead of formatting debug messages on every sample
+_DEBUG = logger.isEnabledFor(logging.DEBUG)
+
+# The depth is shared with the Orifice API through a file-backed memory map
+# (layout in shared_depth.py). The API creates the file and passes it with
+# --shm; running the simulator on its own does nothing useful, as no reader
+# is attached to the file.
 
 class SliderServer:
-    def __init__(self, host='127.0.0.1', port=12345):
-        logger.info(f"Initializing SliderServer on {host}:{port}")
-        self.host = host
-        self.port = port
+    def __init__(self, path, wake_fd=None):
+        logger.info(f"Initializing SliderServer on {path}")
+        self.path = path
         self.depth_value = 0  # Starting at 0 instead of 512
-        self.last_sent_value = None
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        
+        self._cv = threading.Condition()  # Signalled when there is something to publish
+        self._pending = False  # Set when the shared cell lags depth_value
+        self._seq = 0  # Only the publisher thread writes the shared cell
+
         try:
-            self.server_socket.bind((self.host, self.port))
-            logger.info(f"Socket bound to {host}:{port}")
-            self.server_socket.listen(1)
-            logger.debug("Socket listening for connections")
+            # The file must already exist; never create it or follow a symlink
+            fd = os.open(path, os.O_RDWR | getattr(os, "O_NOFOLLOW", 0))
+            try:
+                if os.fstat(fd).st_size < SHM_SIZE:
+                    os.ftruncate(fd, SHM_SIZE)
+                self.shared_depth = mmap.mmap(fd, SHM_SIZE)
+            finally:
+                os.close(fd)
+            logger.info(f"Shared depth mapped from {path}")
         except Exception as e:
-            logger.error(f"Failed to bind socket: {e}")
+            logger.error(f"Failed to map shared depth: {e}")
             raise
+
+        # Optional pipe to the reader: one byte per change wakes it up
+        self.wake_fd = wake_fd
+        if wake_fd is not None:
+            os.set_blocking(wake_fd, False)
             
         self.running = True
-        self.clients = []
         
     def start(self):
-        logger.info("Starting server connection thread")
-        self.thread = threading.Thread(target=self.accept_connections)
-        self.thread.daemon = True
-        self.thread.start()
-        
-    def accept_connections(self):
-        logger.info("Waiting for client connections")
-        while self.running:
-            try:
-                client_socket, client_addr = self.server_socket.accept()
-                logger.info(f"Client connected from {client_addr}")
-                client_socket.setblocking(0)  # Non-blocking socket
-                client_handler = threading.Thread(target=self.handle_client, args=(client_socket, client_addr))
-                client_handler.daemon = True
-                client_handler.start()
-                self.clients.append(client_socket)
-            except Exception as e:
-                if self.running:  # Only log if we're supposed to be running
-                    logger.error(f"Error accepting connection: {e}")
-                time.sleep(0.1)
+        logger.info("Starting publisher thread")
+        self.publisher = threading.Thread(target=self.publish)
+        self.publisher.daemon = True
+        self.publisher.start()
                 
-    def handle_client(self, client_socket, client_addr):
-        logger.info(f"Handling client from {client_addr}")
+    def publish(self):
+        """Single writer: stores each depth change in shared memory and wakes the reader"""
+        while True:
+            with self._cv:
+                self._cv.wait_for(lambda: self._pending or not self.running)
+                if not self.running:
+                    break
+                self._pending = False
+                value = self.depth_value
+
+            self._store(value)
+            if _DEBUG:
+                logger.debug("Published depth %d", value)
+            # Changes made before the reader gets around to poll() share one
+            # wakeup; it reads the latest value from shared memory anyway
+            if self.wake_fd is not None and not self.shared_depth[SHM_WAKE_PENDING]:
+                self.shared_depth[SHM_WAKE_PENDING] = 1
+                try:
+                    os.write(self.wake_fd, b"\x01")
+                except BlockingIOError:
+                    pass  # Pipe full: the reader already has wakeups queued
+                except OSError as e:
+                    # Reader went away; keep updating shared memory regardless
+                    logger.warning(f"Wake pipe closed: {e}")
+                    self._close_wake_fd()
+
+    def _store(self, value):
+        # Seqlock write: odd sequence while the depth is being replaced
+        shm = self.shared_depth
+        SEQ_STRUCT.pack_into(shm, SHM_SEQ, (self._seq + 1) & 0xFFFFFFFF)
+        DEPTH_STRUCT.pack_into(shm, SHM_DEPTH, value)
+        self._seq = (self._seq + 2) & 0xFFFFFFFF
+        SEQ_STRUCT.pack_into(shm, SHM_SEQ, self._seq)
+
+    def _close_wake_fd(self):
+        fd, self.wake_fd = self.wake_fd, None
         try:
-            while self.running:
-                # Only send if value has changed or not sent before
-                if self.depth_value != self.last_sent_value:
-                    try:
-                        message = str(self.depth_value).encode()
-                        client_socket.sendall(message)
-                        logger.debug(f"Sent depth {self.depth_value} to {client_addr}")
-                        self.last_sent_value = self.depth_value
-                    except BlockingIOError:
-                        # Socket would block, just continue
-                        pass
-                    except Exception as e:
-                        logger.error(f"Error sending to client {client_addr}: {e}")
-                        break
-                time.sleep(0.01)  # Faster update rate (100Hz)
-        except Exception as e:
-            logger.error(f"Client handler error: {e}")
-        finally:
-            logger.info(f"Client {client_addr} disconnected")
-            if client_socket in self.clients:
-                self.clients.remove(client_socket)
-            try:
-                client_socket.close()
-            except Exception as e:
-                logger.error(f"Error closing client socket: {e}")
+            os.close(fd)
+        except OSError:
+            pass
             
     def update_depth(self, value):
+        """Tk slider callback: record the value and hand off to the publisher (never blocks on I/O)"""
         value = int(value)
-        if value != self.depth_value:
-            logger.debug(f"Depth value updated to {value}")
-            self.depth_value = value
+        with self._cv:
+            if value != self.depth_value:
+                self.depth_value = value
+                self._pending = True
+                self._cv.notify()
         
     def stop(self):
         logger.info("Stopping server")
-        self.running = False
-        
-        # Close all client connections
-        for client in self.clients[:]:
-            try:
-                client.close()
-                logger.debug("Closed client connection")
-            except:
-                pass
-            self.clients.remove(client)
-            
-        # Close server socket
+        with self._cv:
+            self.running = False
+            self._cv.notify_all()  # Release the publisher
+        if hasattr(self, "publisher"):
+            self.publisher.join(timeout=1.0)
+
+        if self.wake_fd is not None:
+            self._close_wake_fd()
+            logger.debug("Wake pipe closed")
         try:
-            self.server_socket.close()
-            logger.debug("Server socket closed")
+            self.shared_depth.close()
+            logger.debug("Shared depth unmapped")
         except Exception as e:
-            logger.error(f"Error closing server socket: {e}")
+            logger.error(f"Error unmapping shared depth: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Orifice depth slider simulator, launched by the Orifice API "
+                    "with --external-sim; not meant to be run on its own")
+    parser.add_argument("--shm", required=True,
+                        help="existing file backing the shared depth cell, created by the API")
+    parser.add_argument("--wake-fd", type=int, default=None,
+                        help="pipe fd to write a byte to whenever the depth changes")
+    args = parser.parse_args()
+
     logger.info("Starting Orifice Slider Simulator")
     root = tk.Tk()
     root.title("Orifice Depth Simulator")
@@ -128,7 +151,7 @@ def main():
     slider_frame.pack(fill=tk.BOTH, expand=True)
     
     try:
-        server = SliderServer()
+        server = SliderServer(args.shm, args.wake_fd)
         server.start()
         logger.info("Server started successfully")
     except Exception as e:
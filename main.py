@@ -3,8 +3,11 @@ import api.orifice as orifice
 import json
 import textwrap
 import logging
+import math
 import os
+import selectors
 import sys
+import time
 from datetime import datetime
 
 # Configure logging
@@ -16,6 +19,8 @@ logging.basicConfig(
 
 # Get application logger
 logger = logging.getLogger('orifice.app')
+# Hot paths check this instead of formatting debug messages on every sample
+_DEBUG = logger.isEnabledFor(logging.DEBUG)
 logger.info("Application starting")
 
 # Load game info from JSON
@@ -33,16 +38,7 @@ except Exception as e:
     }
     logger.warning("Using default game info")
 
-# Initialize Orifice device
-try:
-    logger.info("Initializing Orifice device")
-    device = orifice.Orifice()
-except Exception as e:
-    logger.critical(f"Failed to initialize device: {e}")
-    pygame.quit()
-    sys.exit(1)
-
-# Initialize Pygame Display
+# Initialize Pygame Display (the app owns pygame's lifecycle, not the device)
 logger.info("Initializing Pygame")
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 480
 try:
@@ -52,7 +48,16 @@ try:
     logger.debug("Pygame display initialized")
 except Exception as e:
     logger.critical(f"Failed to initialize display: {e}")
-    device.close()
+    pygame.quit()
+    sys.exit(1)
+
+# Initialize Orifice device
+try:
+    logger.info("Initializing Orifice device")
+    device = orifice.Orifice(external_sim="--external-sim" in sys.argv[1:])
+except Exception as e:
+    logger.critical(f"Failed to initialize device: {e}")
+    pygame.quit()
     sys.exit(1)
 
 # Fonts
@@ -65,8 +70,13 @@ except Exception as e:
     logger.error(f"Error loading fonts: {e}")
     title_font = font = small_font = pygame.font.SysFont(None, 24)  # Fallback
 
-# Clock
-clock = pygame.time.Clock()
+# Frame pacing: match the display rate; depth changes wake the loop early
+FRAME_TIME = 1 / 60
+
+# Simulator updates are drained from the main loop instead of a reader thread
+sel = selectors.DefaultSelector()
+if device.fileno() is not None:
+    sel.register(device.fileno(), selectors.EVENT_READ)
 
 # Pre-render static text
 title_text = title_font.render(game_info["title"], True, (0, 0, 0))
@@ -76,21 +86,62 @@ version_text = small_font.render(f"Version: {game_info['version']}", True, (100,
 description_lines = textwrap.wrap(game_info["description"], width=70)
 desc_text_surfaces = [small_font.render(line, True, (80, 80, 80)) for line in description_lines]
 
+# Depth is an int in 0-1024, so the bar geometry is computed up front
+MAX_DEPTH = 1024
+depth_bar_rects = []
+for i in range(MAX_DEPTH + 1):
+    bar_height = int((i / MAX_DEPTH) * 200)  # Smaller bar height
+    depth_bar_rects.append(pygame.Rect(SCREEN_WIDTH - 100, SCREEN_HEIGHT - bar_height, 50, bar_height))
+
+# Depth label surfaces, rendered once per depth actually reached rather than
+# all 1025 up front (each antialiased label is several KB of per-pixel alpha)
+depth_surface_cache = {}
+
+def get_depth_surface(depth):
+    surface = depth_surface_cache.get(depth)
+    if surface is None:
+        surface = font.render(f"Depth: {depth}", True, (0, 0, 0))
+        depth_surface_cache[depth] = surface
+    return surface
+
+# FPS label surfaces, rendered once per distinct value
+fps_surface_cache = {}
+
+def get_fps_surface(fps):
+    surface = fps_surface_cache.get(fps)
+    if surface is None:
+        fps_display = f"FPS: {fps}" if fps is not None else "FPS: --"
+        surface = small_font.render(fps_display, True, (100, 100, 100))
+        fps_surface_cache[fps] = surface
+    return surface
+
 # Main Loop
 running = True
 last_depth = -1  # Force first render
 fps_update_time = 0
 frame_count = 0
-fps_display = "FPS: --"
+fps = None
+fps_changed = False
+full_repaint = True  # Draw static content on the first frame
+prev_depth_rect = prev_bar_rect = prev_fps_rect = None
+next_frame = time.monotonic()
+woken_event = None
 
 logger.info("Entering main loop")
 try:
     while running:
-        # Event handling
-        for event in pygame.event.get():
+        # Event handling (including the event that ended the last wait, if any)
+        events = pygame.event.get()
+        if woken_event is not None:
+            events.insert(0, woken_event)
+            woken_event = None
+        for event in events:
             if event.type == pygame.QUIT:
                 logger.info("Quit event received")
                 running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                full_repaint = True
+            device.handle_event(event)
 
         # Get current depth
         try:
@@ -98,53 +149,100 @@ try:
         except Exception as e:
             logger.error(f"Error getting depth: {e}")
             current_depth = last_depth if last_depth >= 0 else 0
+        current_depth = max(0, min(MAX_DEPTH, current_depth))  # Index into the precomputed bar table
             
         current_time = pygame.time.get_ticks()
         
-        # Calculate FPS every second
-        frame_count += 1
+        # Calculate FPS every second (frames are counted at each 60 Hz deadline,
+        # not at early wakeups)
         if current_time - fps_update_time > 1000:
             fps = frame_count
-            fps_display = f"FPS: {fps}"
+            fps_changed = True
             logger.debug(f"FPS: {fps}")
             frame_count = 0
             fps_update_time = current_time
         
-        # Only redraw the screen if depth changes or if 10 frames have passed
-        if current_depth != last_depth or frame_count % 10 == 0:
-            # Fill screen with white
-            screen.fill((255, 255, 255))
-
-            # Draw title and version (static content)
-            screen.blit(title_text, (50, 30))
-            screen.blit(version_text, (SCREEN_WIDTH - 150, 30))
-            
-            # Draw FPS
-            fps_text = small_font.render(fps_display, True, (100, 100, 100))
-            screen.blit(fps_text, (SCREEN_WIDTH - 150, 60))
-            
-            # Draw description
-            for i, surface in enumerate(desc_text_surfaces):
-                screen.blit(surface, (50, 100 + (i * 25)))
+        # Only redraw what changed: the depth display and/or the FPS label
+        depth_changed = current_depth != last_depth
+        if depth_changed or fps_changed or full_repaint:
+            dirty_rects = []
+
+            if full_repaint:
+                # Fill screen with white
+                screen.fill((255, 255, 255))
+
+                # Draw title and version (static content)
+                screen.blit(title_text, (50, 30))
+                screen.blit(version_text, (SCREEN_WIDTH - 150, 30))
+
+                # Draw description
+                for i, surface in enumerate(desc_text_surfaces):
+                    screen.blit(surface, (50, 100 + (i * 25)))
+
+                dirty_rects.append(screen.get_rect())
+
+            if fps_changed or full_repaint:
+                # Erase the old FPS label and draw the new one
+                if prev_fps_rect is not None:
+                    screen.fill((255, 255, 255), prev_fps_rect)
+                    dirty_rects.append(prev_fps_rect)
+                prev_fps_rect = screen.blit(get_fps_surface(fps), (SCREEN_WIDTH - 150, 60))
+                dirty_rects.append(prev_fps_rect)
+
+            if depth_changed or full_repaint:
+                # Erase the depth display drawn last time
+                for rect in (prev_depth_rect, prev_bar_rect):
+                    if rect is not None:
+                        screen.fill((255, 255, 255), rect)
+                        dirty_rects.append(rect)
+
+                # Draw depth as text
+                prev_depth_rect = screen.blit(get_depth_surface(current_depth), (50, 200))
+
+                # Draw depth bar visualization
+                prev_bar_rect = pygame.draw.rect(screen, (0, 0, 255), depth_bar_rects[current_depth])
 
-            # Draw depth as text
-            depth_text = font.render(f"Depth: {current_depth}", True, (0, 0, 0))
-            screen.blit(depth_text, (50, 200))
+                # Draw the in-window slider, if the device uses one
+                slider_rect = device.draw(screen)
+                if slider_rect is not None:
+                    dirty_rects.append(slider_rect)
 
-            # Draw depth bar visualization
-            bar_height = int((current_depth / 1024) * 200)  # Smaller bar height
-            pygame.draw.rect(screen, (0, 0, 255), (SCREEN_WIDTH - 100, SCREEN_HEIGHT - bar_height, 50, bar_height))
+                dirty_rects.extend((prev_depth_rect, prev_bar_rect))
 
-            # Update display
-            pygame.display.flip()
+            # Update only the changed parts of the display
+            pygame.display.update(dirty_rects)
             
-            if current_depth != last_depth:
-                logger.debug(f"Depth updated: {current_depth}")
+            if _DEBUG and depth_changed:
+                logger.debug("Depth updated: %d", current_depth)
                 
             last_depth = current_depth
+            fps_changed = False
+            full_repaint = False
         
-        # Limit frame rate but ensure we process events even if not redrawing
-        clock.tick(120)  # Higher frame rate limit for input responsiveness
+        # Sleep until the next frame is due, but wake early on input: the
+        # simulator's wake pipe, or pygame events (mouse, joystick, quit)
+        now = time.monotonic()
+        if now >= next_frame:
+            frame_count += 1
+            next_frame += FRAME_TIME
+            if next_frame < now:
+                next_frame = now + FRAME_TIME  # Fell behind; don't try to catch up
+        timeout = max(0, next_frame - now)
+        if sel.get_map():
+            for key, _ in sel.select(timeout=timeout):
+                if not device.poll():
+                    sel.unregister(key.fileobj)
+        else:
+            # No descriptor to select on (joystick, in-window slider): wait on
+            # pygame's event queue so input still wakes the loop. Note that
+            # pygame's wait() is not a true block; it pumps events and sleeps
+            # ~1 ms at a time, so it costs more CPU than a plain sleep.
+            # Round up: truncating would turn the last sub-millisecond before
+            # each deadline into wait(0) (block forever) or a skipped wait (spin).
+            if timeout > 0:
+                event = pygame.event.wait(math.ceil(timeout * 1000))
+                if event.type != pygame.NOEVENT:
+                    woken_event = event  # Handled at the top of the next pass
         
 except Exception as e:
     logger.critical(f"Unhandled exception in main loop: {e}", exc_info=True)